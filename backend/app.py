@@ -4,16 +4,33 @@ Main application file with API endpoints
 """
 
 from flask import Flask, request, jsonify, send_from_directory
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
 import os
 import logging
+import random
+import orjson
 from services.weather_service import WeatherService
 from services.mock_weather_service import MockWeatherService
 from services.cache_service import CacheService
 from config import Config
 
+def dump_json_bytes(obj):
+    """Serialize to JSON bytes; shared by the app provider and cached responses"""
+    return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+
+class OrjsonProvider(JSONProvider):
+    """JSON provider backed by orjson for faster (de)serialization"""
+
+    def dumps(self, obj, **kwargs):
+        return dump_json_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 # Initialize Flask app
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 app.config.from_object(Config)
 
 # Enable CORS for frontend communication
@@ -21,12 +38,31 @@ CORS(app)
 
 # Initialize services
 weather_service = MockWeatherService() if Config.TEST_MODE else WeatherService()
-cache_service = CacheService()
+cache_service = CacheService(max_size=Config.CACHE_MAX_SIZE, compress=Config.CACHE_COMPRESSION)
+
+# Test-mode city list and a dedicated RNG for random city picks
+test_cities = tuple(weather_service.get_available_cities()) if Config.TEST_MODE else ()
+_rng = random.Random()
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def make_cache_key(city, units):
+    """Build the cache key for a city and unit system"""
+    return f"{city.lower()}_{units}"
+
+def cached_json_response(cache_key):
+    """Build a JSON response from a cache entry, or return None on a miss"""
+    # Entries cached with their serialized bytes are served without re-encoding
+    body = cache_service.get_serialized(cache_key)
+    if body is None:
+        cached_data = cache_service.get(cache_key)
+        if not cached_data:
+            return None
+        body = dump_json_bytes(cached_data)
+    return app.response_class(body, mimetype='application/json')
+
 @app.route('/')
 def index():
     """Serve the main frontend page"""
@@ -51,15 +87,21 @@ def health_check():
 def get_weather():
     """Get weather data for a city"""
     try:
+        # Parse request body once with orjson
+        try:
+            body = orjson.loads(request.get_data() or b'{}')
+        except orjson.JSONDecodeError:
+            body = None
+
         # Validate request data
-        if not request.json or 'city' not in request.json:
+        if not isinstance(body, dict) or 'city' not in body:
             return jsonify({
                 'status': 'error',
                 'message': 'City name is required'
             }), 400
 
-        city = request.json['city'].strip()
-        units = request.json.get('units', 'metric')
+        city = body['city'].strip()
+        units = body.get('units', 'metric')
 
         # Validate city name
         if not city or len(city) < 2:
@@ -69,27 +111,31 @@ def get_weather():
             }), 400
 
         # Check cache first
-        cache_key = f"{city.lower()}_{units}"
-        cached_data = cache_service.get(cache_key)
+        cache_key = make_cache_key(city, units)
+        cached_response = cached_json_response(cache_key)
         
-        if cached_data:
-            logger.info(f"Returning cached data for {city}")
-            return jsonify(cached_data)
-
-        # Fetch from OpenWeatherMap API
-        weather_data = weather_service.get_weather_by_city(city, units)
+        if cached_response is not None:
+            logger.debug("Returning cached data for %s", city)
+            return cached_response
+
+        # Fetch from OpenWeatherMap API, sharing one upstream call between
+        # concurrent misses; successful responses are cached for 15 minutes
+        weather_data, payload = cache_service.get_or_compute_serialized(
+            cache_key,
+            lambda: weather_service.get_weather_by_city(city, units),
+            dump_json_bytes,
+            ttl=900,
+            cacheable=lambda data: data['status'] != 'error'
+        )
         
         if weather_data['status'] == 'error':
-            return jsonify(weather_data), 404
-
-        # Cache successful response for 15 minutes
-        cache_service.set(cache_key, weather_data, ttl=900)
+            return app.response_class(payload, status=404, mimetype='application/json')
         
-        logger.info(f"Fetched fresh weather data for {city}")
-        return jsonify(weather_data)
+        logger.info("Fetched fresh weather data for %s", city)
+        return app.response_class(payload, mimetype='application/json')
 
     except Exception as e:
-        logger.error(f"Error processing weather request: {str(e)}")
+        logger.error("Error processing weather request: %s", e)
         return jsonify({
             'status': 'error',
             'message': 'Internal server error. Please try again later.'
@@ -100,11 +146,11 @@ def get_cached_weather(city):
     """Get cached weather data for a city"""
     try:
         units = request.args.get('units', 'metric')
-        cache_key = f"{city.lower()}_{units}"
-        cached_data = cache_service.get(cache_key)
+        cache_key = make_cache_key(city, units)
+        cached_response = cached_json_response(cache_key)
         
-        if cached_data:
-            return jsonify(cached_data)
+        if cached_response is not None:
+            return cached_response
         else:
             return jsonify({
                 'status': 'error',
@@ -112,7 +158,7 @@ def get_cached_weather(city):
             }), 404
 
     except Exception as e:
-        logger.error(f"Error retrieving cached data: {str(e)}")
+        logger.error("Error retrieving cached data: %s", e)
         return jsonify({
             'status': 'error',
             'message': 'Error retrieving cached data'
@@ -128,14 +174,13 @@ def get_test_cities():
         }), 403
     
     try:
-        cities = weather_service.get_available_cities()
         return jsonify({
             'status': 'success',
-            'cities': cities,
+            'cities': test_cities,
             'message': 'Available test cities'
         })
     except Exception as e:
-        logger.error(f"Error getting test cities: {str(e)}")
+        logger.error("Error getting test cities: %s", e)
         return jsonify({
             'status': 'error',
             'message': 'Error retrieving test cities'
@@ -151,15 +196,13 @@ def get_random_weather():
         }), 403
     
     try:
-        import random
-        cities = weather_service.get_available_cities()
-        random_city = random.choice(cities)
+        random_city = _rng.choice(test_cities)
         units = request.args.get('units', 'metric')
         
         weather_data = weather_service.get_weather_by_city(random_city, units)
         return jsonify(weather_data)
     except Exception as e:
-        logger.error(f"Error getting random weather: {str(e)}")
+        logger.error("Error getting random weather: %s", e)
         return jsonify({
             'status': 'error',
             'message': 'Error retrieving random weather data'
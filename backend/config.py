@@ -20,6 +20,8 @@ class Config:
     
     # Cache configuration
     CACHE_DEFAULT_TTL = int(os.getenv('CACHE_DEFAULT_TTL', '900'))  # 15 minutes
+    CACHE_MAX_SIZE = int(os.getenv('CACHE_MAX_SIZE', '10000'))
+    CACHE_COMPRESSION = os.getenv('CACHE_COMPRESSION', 'False').lower() == 'true'
     
     # Rate limiting
     RATE_LIMIT_REQUESTS = int(os.getenv('RATE_LIMIT_REQUESTS', '100'))
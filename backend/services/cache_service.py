@@ -4,18 +4,216 @@ Cache Service - Simple in-memory caching for weather data
 
 import time
 import threading
-from typing import Dict, Any, Optional
+import weakref
+from collections import OrderedDict
+from typing import Dict, Any, Callable, List, Optional, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
-class CacheService:
-    """Simple in-memory cache with TTL support"""
+# Number of lock stripes; must be a power of two
+SHARD_COUNT = 32
+
+# Expiry times are integer nanoseconds on the monotonic clock
+NS_PER_SECOND = 1_000_000_000
+
+# Smallest bytes payload worth compressing when compression is enabled
+COMPRESS_MIN_SIZE = 256
+
+def _cleanup_loop(cache_ref: "weakref.ref[CacheService]", interval: float) -> None:
+    """Periodically remove expired entries until the cache is garbage collected"""
+    while True:
+        time.sleep(interval)
+        cache = cache_ref()
+        if cache is None:
+            return
+        # Keep sweeping even if a single pass fails
+        try:
+            cache.cleanup_expired()
+        except Exception:
+            logger.exception("Cache cleanup failed")
+        del cache
+
+class _CacheEntry:
+    """Cached value with its expiry and creation times"""
+    
+    __slots__ = ('value', 'expires_at', 'created_at', 'serialized')
+    
+    def __init__(self, value: Any, expires_at: int, created_at: int,
+                 serialized: Optional[bytes] = None):
+        self.value = value
+        self.expires_at = expires_at
+        self.created_at = created_at
+        self.serialized = serialized
+
+class _Compressed:
+    """Marker wrapping a zstd-compressed bytes payload"""
+    
+    __slots__ = ('data',)
+    
+    def __init__(self, data: bytes):
+        self.data = data
+
+class _InFlight:
+    """Result slot shared by callers waiting on the same cache miss"""
+    
+    __slots__ = ('event', 'value', 'serialized', 'error')
     
     def __init__(self):
-        self._cache: Dict[str, Dict[str, Any]] = {}
-        self._lock = threading.RLock()
+        self.event = threading.Event()
+        self.value = None
+        self.serialized = None
+        self.error = None
+
+class CacheService:
+    """Simple in-memory cache with TTL support and LRU eviction"""
+    
+    def __init__(self, max_size: int = 10_000, cleanup_interval: Optional[float] = 60,
+                 compress: bool = False):
+        """
+        Args:
+            max_size (int): Maximum number of entries across all shards
+            cleanup_interval (float): Seconds between background sweeps for
+                expired entries, or None to disable the sweeper
+            compress (bool): Store bytes values and serialized forms larger
+                than COMPRESS_MIN_SIZE zstd-compressed
+        """
+        self.max_size = max_size
+        self.compress = compress
+        
+        # Reusable (compressor, decompressor) pairs. A zstd context must not be
+        # used concurrently, so each call borrows a pair and returns it; list
+        # pop/append are atomic, so this holds for threads and gevent greenlets
+        # alike, and the pool only grows to the peak number of concurrent users.
+        self._codec_pool: List[Tuple[Any, Any]] = []
+        if compress:
+            import zstandard  # Only required when compression is enabled
+            self._zstd = zstandard
+            self._codec_pool.append(self._new_codecs())
+        
+        # Entries are striped across shards, each guarded by its own lock,
+        # so requests for different cities don't contend on a single lock.
+        # Each shard is kept in LRU order, coldest entry first.
+        self._shards: List[OrderedDict] = [OrderedDict() for _ in range(SHARD_COUNT)]
+        self._locks = [threading.RLock() for _ in range(SHARD_COUNT)]
+        
+        # Number of stored entries across all shards, enforcing max_size
+        self._size = 0
+        self._size_lock = threading.Lock()
+        
+        # Loads currently in progress, keyed by cache key
+        self._inflight: Dict[str, _InFlight] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Running total of entries removed by cleanup_expired()
+        self._swept_count = 0
+        self._stats_lock = threading.Lock()
         
+        # Expired entries are swept in the background, one shard at a time,
+        # so neither get_stats() nor the request path checks expiry across
+        # the whole cache
+        if cleanup_interval:
+            threading.Thread(
+                target=_cleanup_loop,
+                args=(weakref.ref(self), cleanup_interval),
+                name='cache-cleanup',
+                daemon=True
+            ).start()
+    
+    def _shard(self, key: str) -> Tuple[OrderedDict, threading.RLock]:
+        """Return the shard dict and lock responsible for a key"""
+        i = hash(key) & (SHARD_COUNT - 1)
+        return self._shards[i], self._locks[i]
+        
+    def _adjust_size(self, delta: int) -> None:
+        """Update the stored entry count"""
+        if delta:
+            with self._size_lock:
+                self._size += delta
+    
+    def _evict_one(self, start: int) -> bool:
+        """
+        Evict the coldest entry, starting with shard ``start``
+        
+        The entry just written to ``start`` is never chosen; if it is the only
+        entry there, the following shards are tried in turn. Only one shard
+        lock is held at a time.
+        
+        Returns:
+            bool: True if an entry was evicted
+        """
+        for offset in range(SHARD_COUNT):
+            i = (start + offset) & (SHARD_COUNT - 1)
+            shard = self._shards[i]
+            with self._locks[i]:
+                if len(shard) > (1 if offset == 0 else 0):
+                    evicted_key, _ = shard.popitem(last=False)
+                    logger.debug("Cache evicted: %s", evicted_key)
+                    return True
+        return False
+    
+    def _new_codecs(self) -> Tuple[Any, Any]:
+        """Create a zstd compressor and decompressor pair"""
+        return self._zstd.ZstdCompressor(level=3), self._zstd.ZstdDecompressor()
+    
+    def _borrow_codecs(self) -> Tuple[Any, Any]:
+        """Take a codec pair from the pool, creating one if it is empty"""
+        try:
+            return self._codec_pool.pop()
+        except IndexError:
+            return self._new_codecs()
+    
+    def _compress(self, data: Any) -> Any:
+        """Compress a large bytes payload if compression is enabled"""
+        if not self.compress or not isinstance(data, bytes) or len(data) <= COMPRESS_MIN_SIZE:
+            return data
+        codecs = self._borrow_codecs()
+        try:
+            return _Compressed(codecs[0].compress(data))
+        finally:
+            self._codec_pool.append(codecs)
+    
+    def _decompress(self, data: Any) -> Any:
+        """Undo _compress() for a stored payload"""
+        if type(data) is not _Compressed:
+            return data
+        codecs = self._borrow_codecs()
+        try:
+            return codecs[1].decompress(data.data)
+        finally:
+            self._codec_pool.append(codecs)
+    
+    def _get_entry(self, key: str) -> Optional[_CacheEntry]:
+        """Return the live entry for a key, or None if not found/expired"""
+        # Lock-free read: entries are replaced wholesale under the shard lock
+        # and never mutated in place, and a single dict lookup is atomic, so
+        # the hit path needs no locking. Expired entries are left to be
+        # overwritten by set() or removed by cleanup_expired().
+        shard, lock = self._shard(key)
+        entry = shard.get(key)
+        if entry is None:
+            return None
+        
+        # Check if entry has expired
+        if time.monotonic_ns() > entry.expires_at:
+            logger.debug("Cache entry expired: %s", key)
+            return None
+        
+        # Mark as most recently used. Reordering mutates the shard, so it is
+        # only done under the shard lock, and skipped if the lock is busy
+        # rather than making the hit wait. The key may also have been
+        # evicted concurrently, in which case the hit is still served.
+        if lock.acquire(blocking=False):
+            try:
+                shard.move_to_end(key)
+            except KeyError:
+                pass
+            finally:
+                lock.release()
+        
+        logger.debug("Cache hit: %s", key)
+        return entry
+    
     def get(self, key: str) -> Optional[Any]:
         """
         Get value from cache
@@ -26,23 +224,25 @@ class CacheService:
         Returns:
             Any: Cached value or None if not found/expired
         """
-        with self._lock:
-            if key not in self._cache:
-                return None
-            
-            entry = self._cache[key]
-            current_time = time.time()
-            
-            # Check if entry has expired
-            if current_time > entry['expires_at']:
-                del self._cache[key]
-                logger.debug(f"Cache entry expired: {key}")
-                return None
+        entry = self._get_entry(key)
+        return self._decompress(entry.value) if entry is not None else None
+    
+    def get_serialized(self, key: str) -> Optional[bytes]:
+        """
+        Get the pre-serialized form of a cached value
+        
+        Args:
+            key (str): Cache key
             
-            logger.debug(f"Cache hit: {key}")
-            return entry['value']
+        Returns:
+            bytes: Serialized value, or None if not found/expired or the
+                value was cached without a serialized form
+        """
+        entry = self._get_entry(key)
+        return self._decompress(entry.serialized) if entry is not None else None
     
-    def set(self, key: str, value: Any, ttl: int = 900) -> None:
+    def set(self, key: str, value: Any, ttl: int = 900,
+            serialized: Optional[bytes] = None) -> None:
         """
         Set value in cache with TTL
         
@@ -50,15 +250,135 @@ class CacheService:
             key (str): Cache key
             value (Any): Value to cache
             ttl (int): Time to live in seconds (default: 15 minutes)
+            serialized (bytes): Optional pre-serialized form of the value,
+                returned by get_serialized() so hits skip re-encoding
         """
-        with self._lock:
-            expires_at = time.time() + ttl
-            self._cache[key] = {
-                'value': value,
-                'expires_at': expires_at,
-                'created_at': time.time()
-            }
-            logger.debug(f"Cache set: {key} (TTL: {ttl}s)")
+        # Compress before taking the shard lock
+        value = self._compress(value)
+        serialized = self._compress(serialized)
+        
+        i = hash(key) & (SHARD_COUNT - 1)
+        shard = self._shards[i]
+        with self._locks[i]:
+            is_new = key not in shard
+            created_at = time.monotonic_ns()
+            shard[key] = _CacheEntry(value, created_at + ttl * NS_PER_SECOND, created_at, serialized)
+            shard.move_to_end(key)
+            logger.debug("Cache set: %s (TTL: %ss)", key, ttl)
+        
+        if not is_new:
+            return
+        
+        # Discard the coldest entries once the cache is over capacity. Each
+        # eviction is reserved against the counter first so concurrent
+        # writers never evict more than the overflow.
+        with self._size_lock:
+            self._size += 1
+        while True:
+            with self._size_lock:
+                if self._size <= self.max_size:
+                    break
+                self._size -= 1
+            if not self._evict_one(i):
+                self._adjust_size(1)
+                break
+    
+    def get_or_compute(self, key: str, loader: Callable[[], Any], ttl: int = 900,
+                       cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Get value from cache, loading it on a miss
+        
+        Concurrent misses for the same key share a single loader call: the
+        first caller runs it and the others wait for its result.
+        
+        Args:
+            key (str): Cache key
+            loader (callable): Zero-argument function producing the value
+            ttl (int): Time to live in seconds (default: 15 minutes)
+            cacheable (callable): Optional predicate deciding whether a loaded
+                value should be stored (e.g. to skip error responses)
+            
+        Returns:
+            Any: Cached or freshly loaded value
+        """
+        return self._get_or_load(key, loader, ttl, cacheable, None)[0]
+    
+    def get_or_compute_serialized(self, key: str, loader: Callable[[], Any],
+                                  serializer: Callable[[Any], bytes], ttl: int = 900,
+                                  cacheable: Optional[Callable[[Any], bool]] = None
+                                  ) -> Tuple[Any, bytes]:
+        """
+        Like get_or_compute(), also returning the value's serialized form
+        
+        A loaded value is serialized once; the bytes are stored alongside it
+        and returned to every caller sharing the load.
+        
+        Args:
+            key (str): Cache key
+            loader (callable): Zero-argument function producing the value
+            serializer (callable): Function producing the serialized form
+            ttl (int): Time to live in seconds (default: 15 minutes)
+            cacheable (callable): Optional predicate deciding whether a loaded
+                value should be stored (e.g. to skip error responses)
+            
+        Returns:
+            tuple: Cached or freshly loaded value and its serialized form
+        """
+        return self._get_or_load(key, loader, ttl, cacheable, serializer)
+    
+    def _cached_pair(self, entry: _CacheEntry,
+                     serializer: Optional[Callable[[Any], bytes]]) -> Tuple[Any, Optional[bytes]]:
+        """Return an entry's value and, if a serializer is given, its serialized form"""
+        value = self._decompress(entry.value)
+        if serializer is None:
+            return value, None
+        serialized = self._decompress(entry.serialized)
+        return value, serialized if serialized is not None else serializer(value)
+    
+    def _get_or_load(self, key: str, loader: Callable[[], Any], ttl: int,
+                     cacheable: Optional[Callable[[Any], bool]],
+                     serializer: Optional[Callable[[Any], bytes]]) -> Tuple[Any, Optional[bytes]]:
+        """Shared implementation of get_or_compute() and get_or_compute_serialized()"""
+        entry = self._get_entry(key)
+        if entry is not None:
+            return self._cached_pair(entry, serializer)
+        
+        with self._inflight_lock:
+            call = self._inflight.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlight()
+                self._inflight[key] = call
+        
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            if serializer is not None and call.serialized is None and call.value is not None:
+                return call.value, serializer(call.value)
+            return call.value, call.serialized
+        
+        try:
+            # A previous leader may have stored the value between our cache
+            # check and registering as leader
+            entry = self._get_entry(key)
+            if entry is not None:
+                call.value, call.serialized = self._cached_pair(entry, serializer)
+                return call.value, call.serialized
+            
+            call.value = loader()
+            if call.value is not None and serializer is not None:
+                call.serialized = serializer(call.value)
+            if call.value is not None and (cacheable is None or cacheable(call.value)):
+                self.set(key, call.value, ttl=ttl, serialized=call.serialized)
+            return call.value, call.serialized
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._inflight_lock:
+                del self._inflight[key]
+            call.event.set()
     
     def delete(self, key: str) -> bool:
         """
@@ -70,19 +390,25 @@ class CacheService:
         Returns:
             bool: True if key existed, False otherwise
         """
-        with self._lock:
-            if key in self._cache:
-                del self._cache[key]
-                logger.debug(f"Cache deleted: {key}")
+        shard, lock = self._shard(key)
+        with lock:
+            if key in shard:
+                del shard[key]
+                self._adjust_size(-1)
+                logger.debug("Cache deleted: %s", key)
                 return True
             return False
     
     def clear(self) -> None:
         """Clear all cache entries"""
-        with self._lock:
-            count = len(self._cache)
-            self._cache.clear()
-            logger.info(f"Cache cleared: {count} entries removed")
+        count = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                removed = len(shard)
+                shard.clear()
+            self._adjust_size(-removed)
+            count += removed
+        logger.info("Cache cleared: %s entries removed", count)
     
     def cleanup_expired(self) -> int:
         """
@@ -91,42 +417,55 @@ class CacheService:
         Returns:
             int: Number of entries removed
         """
-        with self._lock:
-            current_time = time.time()
-            expired_keys = [
-                key for key, entry in self._cache.items()
-                if current_time > entry['expires_at']
-            ]
-            
-            for key in expired_keys:
-                del self._cache[key]
-            
-            if expired_keys:
-                logger.info(f"Cache cleanup: {len(expired_keys)} expired entries removed")
-            
-            return len(expired_keys)
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                current_time = time.monotonic_ns()
+                expired_keys = [
+                    key for key, entry in shard.items()
+                    if current_time > entry.expires_at
+                ]
+                
+                for key in expired_keys:
+                    del shard[key]
+            self._adjust_size(-len(expired_keys))
+            removed += len(expired_keys)
+        
+        with self._stats_lock:
+            self._swept_count += removed
+        
+        if removed:
+            logger.info("Cache cleanup: %s expired entries removed", removed)
+        
+        return removed
     
     def get_stats(self) -> Dict[str, Any]:
         """
         Get cache statistics
         
+        Counts come from running counters rather than a scan, so entries are
+        not checked for expiry here: active_entries counts every entry not
+        yet swept, including any that expired since the last cleanup pass.
+        
         Returns:
             dict: Cache statistics including size, entries info
         """
-        with self._lock:
-            current_time = time.time()
-            total_entries = len(self._cache)
-            expired_entries = sum(
-                1 for entry in self._cache.values()
-                if current_time > entry['expires_at']
-            )
-            
-            return {
-                'total_entries': total_entries,
-                'active_entries': total_entries - expired_entries,
-                'expired_entries': expired_entries,
-                'cache_keys': list(self._cache.keys())
-            }
+        cache_keys = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                cache_keys.extend(shard.keys())
+        
+        with self._size_lock:
+            total_entries = self._size
+        with self._stats_lock:
+            swept_total = self._swept_count
+        
+        return {
+            'total_entries': total_entries,
+            'active_entries': total_entries,
+            'swept_total': swept_total,
+            'cache_keys': cache_keys
+        }
     
     def has_key(self, key: str) -> bool:
         """
@@ -150,14 +489,15 @@ class CacheService:
         Returns:
             int: Remaining seconds or None if key doesn't exist
         """
-        with self._lock:
-            if key not in self._cache:
+        shard, lock = self._shard(key)
+        with lock:
+            if key not in shard:
                 return None
             
-            entry = self._cache[key]
-            current_time = time.time()
+            entry = shard[key]
+            current_time = time.monotonic_ns()
             
-            if current_time > entry['expires_at']:
+            if current_time > entry.expires_at:
                 return 0
             
-            return int(entry['expires_at'] - current_time)
\ No newline at end of file
+            return (entry.expires_at - current_time) // NS_PER_SECOND
\ No newline at end of file
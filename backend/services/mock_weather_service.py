@@ -4,10 +4,25 @@ Provides dummy weather data without external API calls
 """
 
 import random
+import time
 from datetime import datetime
 
 class MockWeatherService:
+    # Imperial unit conversion constants
+    FAHRENHEIT_SCALE = 9 / 5
+    FAHRENHEIT_OFFSET = 32
+    MPS_TO_MPH = 2.237
+
+    # Sizes of the temperature (-3..3), humidity (-5..5) and wind (-2..2)
+    # variation ranges, combined into a single random draw per request
+    _TEMP_SPAN = 7
+    _HUMIDITY_SPAN = 11
+    _WIND_SPAN = 5
+
     def __init__(self):
+        self._rng = random.Random()
+        # (unix second, ISO string) of the last generated timestamp
+        self._timestamp_cache = (None, None)
         self.mock_data = {
             'london': {
                 'temperature': 18,
@@ -66,6 +81,26 @@ class MockWeatherService:
                 'weather_icon': '13d'
             }
         }
+        self._cities = tuple(self.mock_data)
+
+        # Ready-made response per city; only the varying fields are
+        # filled in on each request
+        self._templates = {
+            key: {
+                'status': 'success',
+                'city': key.title(),
+                'country': 'Test Country',
+                'temperature': None,
+                'description': data['description'],
+                'humidity': None,
+                'wind_speed': None,
+                'weather_icon': data['weather_icon'],
+                'units': None,
+                'timestamp': None,
+                'is_mock_data': True
+            }
+            for key, data in self.mock_data.items()
+        }
 
     def get_weather_by_city(self, city, units='metric'):
         """
@@ -79,37 +114,40 @@ class MockWeatherService:
                 'message': f'City "{city}" not found in test data'
             }
 
-        base_data = self.mock_data[city_key].copy()
+        base_data = self.mock_data[city_key]
         
-        # Add some randomness to make it more realistic
-        temp_variation = random.randint(-3, 3)
-        base_data['temperature'] += temp_variation
-        base_data['humidity'] += random.randint(-5, 5)
-        base_data['wind_speed'] += random.randint(-2, 2)
+        # Add some randomness to make it more realistic; one draw is split
+        # into the three independent variations
+        draw = self._rng.randrange(self._TEMP_SPAN * self._HUMIDITY_SPAN * self._WIND_SPAN)
+        draw, temp_variation = divmod(draw, self._TEMP_SPAN)
+        wind_variation, humidity_variation = divmod(draw, self._HUMIDITY_SPAN)
+        temperature = base_data['temperature'] + temp_variation - 3
+        humidity = base_data['humidity'] + humidity_variation - 5
+        wind_speed = base_data['wind_speed'] + wind_variation - 2
         
         # Convert temperature if units are imperial
         if units == 'imperial':
-            base_data['temperature'] = (base_data['temperature'] * 9/5) + 32
-            base_data['wind_speed'] *= 2.237  # Convert m/s to mph
+            temperature = temperature * self.FAHRENHEIT_SCALE + self.FAHRENHEIT_OFFSET
+            wind_speed *= self.MPS_TO_MPH  # Convert m/s to mph
 
-        return {
-            'status': 'success',
-            'city': city.title(),
-            'country': 'Test Country',
-            'temperature': base_data['temperature'],
-            'description': base_data['description'],
-            'humidity': max(0, min(100, base_data['humidity'])),
-            'wind_speed': max(0, base_data['wind_speed']),
-            'weather_icon': base_data['weather_icon'],
-            'units': units,
-            'timestamp': datetime.now().isoformat(),
-            'is_mock_data': True
-        }
+        response = self._templates[city_key].copy()
+        response['temperature'] = temperature
+        response['humidity'] = max(0, min(100, humidity))
+        response['wind_speed'] = max(0, wind_speed)
+        response['units'] = units
+        response['timestamp'] = self.get_current_timestamp()
+        return response
 
     def get_available_cities(self):
-        """Get list of available test cities"""
-        return list(self.mock_data.keys())
+        """Get available test cities as a tuple (built once at init)"""
+        return self._cities
 
     def get_current_timestamp(self):
-        """Get current timestamp"""
-        return datetime.now().isoformat()
+        """Get current timestamp, regenerated once per second"""
+        now = time.time()
+        second = int(now)
+        cached_second, timestamp = self._timestamp_cache
+        if cached_second != second:
+            timestamp = datetime.fromtimestamp(now).isoformat()
+            self._timestamp_cache = (second, timestamp)
+        return timestamp
@@ -4,20 +4,48 @@ Handles all weather data fetching and processing
 """
 
 import requests
+from requests.adapters import HTTPAdapter
 import logging
+import time
+from functools import lru_cache
 from datetime import datetime, timezone
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+@lru_cache(maxsize=8192)
+def _format_unix_timestamp(timestamp):
+    """Convert Unix timestamp to ISO format (memoized)"""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
 class WeatherService:
     """Service class for OpenWeatherMap API integration"""
     
+    # Unit labels per requested unit system, shared by all responses
+    # (treat as read-only). Anything other than metric/imperial is Kelvin.
+    _WEATHER_UNITS = {
+        'metric': {'temperature': '°C', 'wind_speed': 'm/s', 'pressure': 'hPa'},
+        'imperial': {'temperature': '°F', 'wind_speed': 'mph', 'pressure': 'hPa'},
+        'kelvin': {'temperature': 'K', 'wind_speed': 'mph', 'pressure': 'hPa'}
+    }
+    _FORECAST_UNITS = {
+        'metric': {'temperature': '°C', 'wind_speed': 'm/s'},
+        'imperial': {'temperature': '°F', 'wind_speed': 'mph'},
+        'kelvin': {'temperature': 'K', 'wind_speed': 'mph'}
+    }
+    
     def __init__(self):
         self.api_key = Config.OPENWEATHERMAP_API_KEY
         self.base_url = Config.OPENWEATHERMAP_BASE_URL
         self.timeout = Config.REQUEST_TIMEOUT
         
+        # Shared session so upstream TCP/TLS connections are pooled and reused
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=20, pool_maxsize=50))
+        
+        # (unix second, ISO string) of the last generated timestamp
+        self._timestamp_cache = (None, None)
+        
         # Validate API key on initialization
         if not self.api_key:
             logger.warning("OpenWeatherMap API key not configured")
@@ -42,10 +70,10 @@ class WeatherService:
                 'units': units
             }
             
-            logger.info(f"Fetching weather data for {city}")
+            logger.info("Fetching weather data for %s", city)
             
             # Make API request
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self.session.get(url, params=params, timeout=self.timeout)
             
             if response.status_code == 200:
                 data = response.json()
@@ -65,28 +93,28 @@ class WeatherService:
                 }
             
             else:
-                logger.error(f"API request failed with status {response.status_code}")
+                logger.error("API request failed with status %s", response.status_code)
                 return {
                     'status': 'error',
                     'message': 'Weather service temporarily unavailable. Please try again later.'
                 }
                 
         except requests.exceptions.Timeout:
-            logger.error(f"Timeout fetching weather for {city}")
+            logger.error("Timeout fetching weather for %s", city)
             return {
                 'status': 'error',
                 'message': 'Request timeout. Please try again.'
             }
             
         except requests.exceptions.ConnectionError:
-            logger.error(f"Connection error fetching weather for {city}")
+            logger.error("Connection error fetching weather for %s", city)
             return {
                 'status': 'error',
                 'message': 'Unable to connect to weather service. Please check your internet connection.'
             }
             
         except Exception as e:
-            logger.error(f"Unexpected error fetching weather for {city}: {str(e)}")
+            logger.error("Unexpected error fetching weather for %s: %s", city, e)
             return {
                 'status': 'error',
                 'message': 'An unexpected error occurred. Please try again later.'
@@ -113,7 +141,7 @@ class WeatherService:
                 'cnt': days * 8  # API returns 3-hour intervals, so 8 per day
             }
             
-            response = requests.get(url, params=params, timeout=self.timeout)
+            response = self.session.get(url, params=params, timeout=self.timeout)
             
             if response.status_code == 200:
                 data = response.json()
@@ -125,7 +153,7 @@ class WeatherService:
                 }
                 
         except Exception as e:
-            logger.error(f"Error fetching forecast for {city}: {str(e)}")
+            logger.error("Error fetching forecast for %s: %s", city, e)
             return {
                 'status': 'error',
                 'message': 'Unable to fetch forecast data.'
@@ -133,39 +161,36 @@ class WeatherService:
     
     def _format_weather_response(self, data, units):
         """Format OpenWeatherMap current weather response"""
-        
-        # Determine temperature unit symbol
-        temp_unit = '°C' if units == 'metric' else '°F' if units == 'imperial' else 'K'
+        main = data['main']
+        weather = data['weather'][0]
+        wind = data.get('wind', {})
+        sys_info = data['sys']
         
         return {
             'status': 'success',
             'data': {
-                'city': f"{data['name']}, {data['sys']['country']}",
+                'city': f"{data['name']}, {sys_info['country']}",
                 'coordinates': {
                     'lat': data['coord']['lat'],
                     'lon': data['coord']['lon']
                 },
                 'current': {
-                    'temperature': round(data['main']['temp'], 1),
-                    'feels_like': round(data['main']['feels_like'], 1),
-                    'temp_min': round(data['main']['temp_min'], 1),
-                    'temp_max': round(data['main']['temp_max'], 1),
-                    'humidity': data['main']['humidity'],
-                    'pressure': data['main']['pressure'],
+                    'temperature': round(main['temp'], 1),
+                    'feels_like': round(main['feels_like'], 1),
+                    'temp_min': round(main['temp_min'], 1),
+                    'temp_max': round(main['temp_max'], 1),
+                    'humidity': main['humidity'],
+                    'pressure': main['pressure'],
                     'visibility': data.get('visibility', 'N/A'),
-                    'description': data['weather'][0]['description'].title(),
-                    'icon': data['weather'][0]['icon'],
-                    'wind_speed': data.get('wind', {}).get('speed', 0),
-                    'wind_direction': data.get('wind', {}).get('deg', 0)
-                },
-                'units': {
-                    'temperature': temp_unit,
-                    'wind_speed': 'm/s' if units == 'metric' else 'mph',
-                    'pressure': 'hPa'
+                    'description': weather['description'].title(),
+                    'icon': weather['icon'],
+                    'wind_speed': wind.get('speed', 0),
+                    'wind_direction': wind.get('deg', 0)
                 },
+                'units': self._WEATHER_UNITS.get(units, self._WEATHER_UNITS['kelvin']),
                 'sun': {
-                    'sunrise': self._format_timestamp(data['sys']['sunrise']),
-                    'sunset': self._format_timestamp(data['sys']['sunset'])
+                    'sunrise': self._format_timestamp(sys_info['sunrise']),
+                    'sunset': self._format_timestamp(sys_info['sunset'])
                 },
                 'timestamp': self.get_current_timestamp(),
                 'source': 'OpenWeatherMap'
@@ -174,39 +199,44 @@ class WeatherService:
     
     def _format_forecast_response(self, data, units):
         """Format OpenWeatherMap forecast response"""
-        temp_unit = '°C' if units == 'metric' else '°F' if units == 'imperial' else 'K'
-        
         forecast_items = []
+        append_item = forecast_items.append
         for item in data['list'][:40]:  # Limit to 5 days max
-            forecast_items.append({
+            main = item['main']
+            weather = item['weather'][0]
+            append_item({
                 'datetime': item['dt_txt'],
-                'temperature': round(item['main']['temp'], 1),
-                'description': item['weather'][0]['description'].title(),
-                'icon': item['weather'][0]['icon'],
-                'humidity': item['main']['humidity'],
+                'temperature': round(main['temp'], 1),
+                'description': weather['description'].title(),
+                'icon': weather['icon'],
+                'humidity': main['humidity'],
                 'wind_speed': item.get('wind', {}).get('speed', 0)
             })
         
+        city = data['city']
         return {
             'status': 'success',
             'data': {
-                'city': f"{data['city']['name']}, {data['city']['country']}",
+                'city': f"{city['name']}, {city['country']}",
                 'forecast': forecast_items,
-                'units': {
-                    'temperature': temp_unit,
-                    'wind_speed': 'm/s' if units == 'metric' else 'mph'
-                },
+                'units': self._FORECAST_UNITS.get(units, self._FORECAST_UNITS['kelvin']),
                 'timestamp': self.get_current_timestamp()
             }
         }
     
     def _format_timestamp(self, timestamp):
         """Convert Unix timestamp to ISO format"""
-        return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+        return _format_unix_timestamp(timestamp)
     
     def get_current_timestamp(self):
-        """Get current timestamp in ISO format"""
-        return datetime.now(timezone.utc).isoformat()
+        """Get current timestamp in ISO format, regenerated once per second"""
+        now = time.time()
+        second = int(now)
+        cached_second, timestamp = self._timestamp_cache
+        if cached_second != second:
+            timestamp = datetime.fromtimestamp(now, timezone.utc).isoformat()
+            self._timestamp_cache = (second, timestamp)
+        return timestamp
     
     def is_api_key_valid(self):
         """Check if the API key is configured and basic validation"""
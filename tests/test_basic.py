@@ -5,11 +5,14 @@ Basic tests for Weather Dashboard API
 import pytest
 import sys
 import os
+import threading
+import time
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'backend'))
 
-from backend.app import app
+from backend.app import app, cache_service as app_cache, weather_service as app_weather
 from backend.services.cache_service import CacheService
 from backend.services.weather_service import WeatherService
+from backend.services.mock_weather_service import MockWeatherService
 
 
 @pytest.fixture
@@ -46,6 +49,15 @@ def test_weather_endpoint_missing_city(client):
     assert 'city name is required' in data['message'].lower()
 
 
+def test_weather_endpoint_invalid_json(client):
+    """Test weather endpoint with a malformed request body"""
+    response = client.post('/api/weather', data='{not json', content_type='application/json')
+    assert response.status_code == 400
+    
+    data = response.get_json()
+    assert data['status'] == 'error'
+
+
 def test_weather_endpoint_empty_city(client):
     """Test weather endpoint with empty city"""
     response = client.post('/api/weather', json={'city': ''})
@@ -71,6 +83,68 @@ def test_cached_weather_not_found(client):
     assert response.status_code == 404
 
 
+def test_cached_weather_found(client):
+    """Test getting cached weather for an existing cache entry"""
+    app_cache.set('cachedcity_metric', {'status': 'success', 'city': 'Cachedcity'}, ttl=60)
+    response = client.get('/api/weather/CachedCity')
+    assert response.status_code == 200
+    assert response.mimetype == 'application/json'
+    
+    data = response.get_json()
+    assert data['city'] == 'Cachedcity'
+
+
+def test_weather_endpoint_serves_serialized_cache(client):
+    """Test cached weather is served from the stored serialized bytes"""
+    app_cache.set('serializedcity_metric', {'status': 'success'}, ttl=60,
+                  serialized=b'{"status":"success","city":"Serializedcity"}')
+    response = client.post('/api/weather', json={'city': 'SerializedCity'})
+    assert response.status_code == 200
+    assert response.data == b'{"status":"success","city":"Serializedcity"}'
+
+
+def test_weather_endpoint_fresh_fetch(client, monkeypatch):
+    """Test a fresh fetch is returned and cached as the same serialized bytes"""
+    monkeypatch.setattr(app_weather, 'get_weather_by_city',
+                        lambda city, units: {'status': 'success', 'city': 'Freshcity'})
+    response = client.post('/api/weather', json={'city': 'FreshCity'})
+    assert response.status_code == 200
+    assert response.get_json() == {'status': 'success', 'city': 'Freshcity'}
+    assert app_cache.get_serialized('freshcity_metric') == response.data
+
+
+def test_weather_endpoint_non_string_keys(client, monkeypatch):
+    """Test fresh and cached responses serialize non-string keys like jsonify"""
+    monkeypatch.setattr(app_weather, 'get_weather_by_city',
+                        lambda city, units: {'status': 'success', 'hourly': {1: 'rain'}})
+    response = client.post('/api/weather', json={'city': 'Keycity'})
+    assert response.status_code == 200
+    assert response.get_json()['hourly'] == {'1': 'rain'}
+    
+    app_cache.set('plainkeycity_metric', {'status': 'success', 'hourly': {1: 'rain'}}, ttl=60)
+    response = client.get('/api/weather/PlainKeyCity')
+    assert response.status_code == 200
+    assert response.get_json()['hourly'] == {'1': 'rain'}
+
+
+def test_weather_endpoint_fetch_error(client, monkeypatch):
+    """Test upstream errors return 404 and are not cached"""
+    monkeypatch.setattr(app_weather, 'get_weather_by_city',
+                        lambda city, units: {'status': 'error', 'message': 'City not found'})
+    response = client.post('/api/weather', json={'city': 'Nowhere'})
+    assert response.status_code == 404
+    assert response.get_json()['status'] == 'error'
+    assert app_cache.get('nowhere_metric') is None
+
+
+def test_weather_endpoint_non_string_units(client):
+    """Test weather endpoint tolerates non-string units values"""
+    app_cache.set('unitscity_None', {'status': 'success', 'city': 'Unitscity'}, ttl=60)
+    response = client.post('/api/weather', json={'city': 'UnitsCity', 'units': None})
+    assert response.status_code == 200
+    assert response.get_json()['city'] == 'Unitscity'
+
+
 def test_cache_service():
     """Test cache service basic functionality"""
     cache = CacheService()
@@ -113,6 +187,35 @@ def test_cache_service_ttl():
     assert result is None
 
 
+def test_cache_service_remaining_ttl():
+    """Test cache service remaining TTL reporting"""
+    cache = CacheService()
+    
+    cache.set('test_remaining', 'value', ttl=60)
+    assert 58 <= cache.get_remaining_ttl('test_remaining') <= 60
+    assert cache.get_remaining_ttl('nonexistent') is None
+
+
+def test_cache_service_sweeper_survives_errors():
+    """Test the background sweeper keeps running after a failed pass"""
+    class FlakyCache(CacheService):
+        sweeps = 0
+        
+        def cleanup_expired(self):
+            FlakyCache.sweeps += 1
+            if FlakyCache.sweeps == 1:
+                raise RuntimeError('sweep failed')
+            return super().cleanup_expired()
+    
+    cache = FlakyCache(cleanup_interval=0.01)
+    deadline = time.monotonic() + 2
+    while FlakyCache.sweeps < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    assert FlakyCache.sweeps >= 3
+    del cache
+
+
 def test_cache_service_stats():
     """Test cache service statistics"""
     cache = CacheService()
@@ -130,6 +233,242 @@ def test_cache_service_stats():
     assert stats['active_entries'] == 2
 
 
+def test_cache_service_many_keys():
+    """Test cache service across many keys spread over shards"""
+    cache = CacheService()
+    
+    for i in range(100):
+        cache.set(f'city{i}_metric', i, ttl=60)
+    
+    assert all(cache.get(f'city{i}_metric') == i for i in range(100))
+    assert cache.get_stats()['total_entries'] == 100
+    
+    cache.clear()
+    assert cache.get_stats()['total_entries'] == 0
+
+
+def test_cache_service_lru_eviction():
+    """Test cache service evicts least recently used entries when full"""
+    cache = CacheService(max_size=1)
+    
+    # Find two keys that land in the same shard
+    first = 'city0'
+    shard = cache._shard(first)[0]
+    second = next(f'city{i}' for i in range(1, 1000) if cache._shard(f'city{i}')[0] is shard)
+    
+    cache.set(first, 'first')
+    cache.set(second, 'second')
+    
+    assert cache.get(first) is None
+    assert cache.get(second) == 'second'
+
+
+def test_cache_service_concurrent_reads_during_cleanup():
+    """Test hits refreshing LRU order don't break concurrent shard scans"""
+    cache = CacheService(cleanup_interval=None)
+    keys = [f'city{i}_metric' for i in range(2000)]
+    for key in keys:
+        cache.set(key, key, ttl=60)
+    
+    stop = threading.Event()
+    errors = []
+    
+    def reader():
+        try:
+            while not stop.is_set():
+                for key in keys:
+                    cache.get(key)
+        except Exception as e:
+            errors.append(e)
+    
+    readers = [threading.Thread(target=reader) for _ in range(2)]
+    for t in readers:
+        t.start()
+    try:
+        for _ in range(200):
+            cache.cleanup_expired()
+            cache.get_stats()
+    except Exception as e:
+        errors.append(e)
+    finally:
+        stop.set()
+        for t in readers:
+            t.join()
+    
+    assert errors == []
+
+
+def test_cache_service_max_size_is_global():
+    """Test max_size bounds the whole cache, even below the shard count"""
+    cache = CacheService(max_size=10, cleanup_interval=None)
+    
+    for i in range(50):
+        cache.set(f'city{i}_metric', i)
+    
+    assert cache.get_stats()['total_entries'] == 10
+    assert cache.get('city49_metric') == 49
+    
+    # Overwriting an existing key doesn't evict anything
+    cache.set('city49_metric', 'updated')
+    assert cache.get_stats()['total_entries'] == 10
+    
+    cache.delete('city49_metric')
+    cache.set('city50_metric', 50)
+    assert cache.get_stats()['total_entries'] == 10
+
+
+def test_cache_service_max_size_concurrent_writers():
+    """Test concurrent writers neither overshoot nor over-evict max_size"""
+    cache = CacheService(max_size=100, cleanup_interval=None)
+    
+    def writer(n):
+        for i in range(500):
+            cache.set(f'writer{n}_city{i}', i)
+    
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert cache.get_stats()['total_entries'] == 100
+
+
+def test_cache_service_get_or_compute_single_load():
+    """Test concurrent misses for one key share a single loader call"""
+    cache = CacheService()
+    calls = []
+    
+    def loader():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'status': 'success'}
+    
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(cache.get_or_compute('london_metric', loader)))
+        for _ in range(10)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    assert len(calls) == 1
+    assert results == [{'status': 'success'}] * 10
+    assert cache.get('london_metric') == {'status': 'success'}
+
+
+def test_cache_service_get_or_compute_serializer():
+    """Test loaded values are cached with their serialized form"""
+    cache = CacheService()
+    
+    result = cache.get_or_compute_serialized('paris_metric', lambda: {'status': 'success'},
+                                             lambda v: b'serialized')
+    assert result == ({'status': 'success'}, b'serialized')
+    assert cache.get('paris_metric') == {'status': 'success'}
+    assert cache.get_serialized('paris_metric') == b'serialized'
+    
+    # Hits return the stored bytes instead of serializing again
+    result = cache.get_or_compute_serialized('paris_metric', lambda: None, lambda v: b'again')
+    assert result == ({'status': 'success'}, b'serialized')
+    
+    cache.set('plain', 'value')
+    assert cache.get_serialized('plain') is None
+
+
+def test_cache_service_compression():
+    """Test compressed entries round-trip and small payloads are left as-is"""
+    cache = CacheService(compress=True)
+    payload = b'{"temperature": 18.5, "humidity": 65}' * 20
+    
+    cache.set('london_metric', {'status': 'success'}, serialized=payload)
+    cache.set('raw_bytes', payload)
+    cache.set('small', b'tiny')
+    
+    assert cache.get_serialized('london_metric') == payload
+    assert cache.get('raw_bytes') == payload
+    assert cache.get('small') == b'tiny'
+    
+    entry = cache._shard('london_metric')[0]['london_metric']
+    assert len(entry.serialized.data) < len(payload)
+
+
+
+def test_cache_service_compression_reuses_codecs():
+    """Test zstd contexts are pooled and reused across threads"""
+    cache = CacheService(compress=True, cleanup_interval=None)
+    payload = b'{"temperature": 18.5, "humidity": 65}' * 20
+    
+    def worker(n):
+        for i in range(50):
+            cache.set(f'worker{n}_city{i}', payload)
+            assert cache.get(f'worker{n}_city{i}') == payload
+    
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    # No more pairs than concurrent users, all returned to the pool
+    assert 1 <= len(cache._codec_pool) <= 4
+
+
+def test_cache_service_get_or_compute_rechecks_as_leader():
+    """Test a new leader reuses a value stored just after its cache miss"""
+    cache = CacheService()
+    cache.set('rome_metric', {'status': 'success'})
+    
+    # Simulate missing the cache just before a previous leader stored the value
+    real_get_entry = cache._get_entry
+    lookups = []
+    
+    def get_entry_missing_first(key):
+        lookups.append(key)
+        return None if len(lookups) == 1 else real_get_entry(key)
+    
+    cache._get_entry = get_entry_missing_first
+    
+    calls = []
+    result = cache.get_or_compute('rome_metric', lambda: calls.append(1) or {'status': 'fresh'})
+    assert result == {'status': 'success'}
+    assert calls == []
+    assert len(lookups) == 2
+
+
+def test_cache_service_get_or_compute_not_cacheable():
+    """Test values rejected by the cacheable predicate are not stored"""
+    cache = CacheService()
+    
+    result = cache.get_or_compute('nowhere_metric', lambda: {'status': 'error'},
+                                  cacheable=lambda data: data['status'] != 'error')
+    assert result == {'status': 'error'}
+    assert cache.get('nowhere_metric') is None
+
+
+def test_cache_service_stats_after_sweep():
+    """Test cache statistics before and after expired entries are swept"""
+    cache = CacheService(cleanup_interval=None)
+    cache.set('short', 'value', ttl=1)
+    cache.set('long', 'value', ttl=60)
+    time.sleep(1.1)
+    
+    # Expired entries count as active until a sweep removes them
+    stats = cache.get_stats()
+    assert stats['total_entries'] == 2
+    assert stats['active_entries'] == 2
+    assert stats['swept_total'] == 0
+    
+    assert cache.cleanup_expired() == 1
+    
+    stats = cache.get_stats()
+    assert stats['total_entries'] == 1
+    assert stats['active_entries'] == 1
+    assert stats['swept_total'] == 1
+    assert stats['cache_keys'] == ['long']
+
+
 def test_weather_service_api_key_validation():
     """Test weather service API key validation"""
     service = WeatherService()
@@ -140,6 +479,36 @@ def test_weather_service_api_key_validation():
     assert isinstance(is_valid, bool)
 
 
+def test_mock_weather_service():
+    """Test mock weather service variations stay within range"""
+    service = MockWeatherService()
+    
+    for _ in range(50):
+        data = service.get_weather_by_city(' London ')
+        assert data['status'] == 'success'
+        assert data['city'] == 'London'
+        assert 15 <= data['temperature'] <= 21
+        assert 60 <= data['humidity'] <= 70
+        assert 10 <= data['wind_speed'] <= 14
+    
+    data = service.get_weather_by_city('Atlantis')
+    assert data['status'] == 'error'
+
+
+def test_current_timestamp_matches_cached_second(monkeypatch):
+    """Test cached timestamps are formatted from the clock reading they are keyed by"""
+    from datetime import datetime, timezone
+    
+    # A reading just before a second boundary must not format as the next second
+    monkeypatch.setattr(time, 'time', lambda: 1700000000.999999)
+    
+    weather = WeatherService()
+    assert weather.get_current_timestamp() == datetime.fromtimestamp(1700000000.999999, timezone.utc).isoformat()
+    
+    mock = MockWeatherService()
+    assert mock.get_current_timestamp() == datetime.fromtimestamp(1700000000.999999).isoformat()
+
+
 def test_frontend_served(client):
     """Test that frontend files are served"""
     response = client.get('/')